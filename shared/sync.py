@@ -14,16 +14,78 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import os
+import re
 import subprocess
 import sys
-from multiprocessing.pool import ThreadPool
+from types import SimpleNamespace
 
 from github import Github
 from github.GithubException import GithubException
 
 from . import REPODIR, colors, cprint, get_clones, get_org_repos
 
+# Format for `git branch` output: one branch per line, prefixed by "*" if it's
+# checked out or a space if not. Unlike the default output, this isn't affected
+# by color settings. refname:lstrip=2 is used rather than refname:short, which
+# would print "heads/main" if a tag named "main" also exists.
+BRANCH_FORMAT = "%(HEAD)%(refname:lstrip=2)"
+
+# Matches the checked out branch in `git branch` output using BRANCH_FORMAT
+CURRENT_BRANCH_RE = re.compile(rb"^\*(\S+)$", re.M)
+
+# Summary of forks found, e.g. "1 fork of macadmins repos by user nobody."
+FORKS_SUMMARY = "{count} {f_noun} of {org} {r_noun} by user {user}."
+
+# GraphQL query for one page of the authenticated user's forks and their parents
+FORKS_QUERY = """
+query($cursor: String) {
+  viewer {
+    repositories(
+      first: 100
+      after: $cursor
+      isFork: true
+      ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]
+    ) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name nameWithOwner sshUrl parent { nameWithOwner sshUrl } }
+    }
+  }
+}
+"""
+
+
+def get_forks_graphql(g):
+    """Return the authenticated user's forks and their parent repos using the
+    GraphQL API, which avoids the extra REST request per fork to look up its
+    parent. Forks are namespaces with the same attributes as PyGithub repos."""
+
+    forks = []
+    cursor = None
+    while True:
+        _, data = g.requester.graphql_query(FORKS_QUERY, {"cursor": cursor})
+        page = data["data"]["viewer"]["repositories"]
+        for node in page["nodes"]:
+            # Parent may be missing if it's no longer visible to the user.
+            if not node["parent"]:
+                continue
+            forks.append(
+                SimpleNamespace(
+                    name=node["name"],
+                    full_name=node["nameWithOwner"],
+                    ssh_url=node["sshUrl"],
+                    fork=True,
+                    parent=SimpleNamespace(
+                        full_name=node["parent"]["nameWithOwner"],
+                        ssh_url=node["parent"]["sshUrl"],
+                    ),
+                )
+            )
+        if not page["pageInfo"]["hasNextPage"]:
+            return forks
+        cursor = page["pageInfo"]["endCursor"]
+
 
 def get_user_forks(org_repos, config):
     """Return API information about your forks of org repos."""
@@ -31,9 +93,22 @@ def get_user_forks(org_repos, config):
     # Object for communicating with GitHub API
     g = Github(config["github_token"])
 
-    org_full_names = [x.full_name for x in org_repos]
+    org_full_names = {x.full_name for x in org_repos}
+    repos = None
+    # Older versions of PyGithub can't make GraphQL queries
+    if hasattr(getattr(g, "requester", None), "graphql_query"):
+        try:
+            repos = get_forks_graphql(g)
+        except GithubException as err:
+            cprint(
+                f"WARNING: Unable to list forks using the GitHub GraphQL API: {err}\n"
+                "Falling back to the REST API, which may take longer.",
+                colors.WARNING,
+            )
+    if repos is None:
+        repos = g.get_user().get_repos(type="forks")
     user_forks = []
-    for repo in g.get_user().get_repos(type="forks"):
+    for repo in repos:
         if not repo.fork:
             continue
         if repo.parent.full_name in org_full_names:
@@ -42,8 +117,13 @@ def get_user_forks(org_repos, config):
     f_noun = "fork" if len(user_forks) == 1 else "forks"
     r_noun = "repo" if len(org_repos) == 1 else "repos"
     print(
-        f"{len(user_forks)} {f_noun} of {config['github_org']} "
-        f"{r_noun} by user {config['github_username']}."
+        FORKS_SUMMARY.format(
+            count=len(user_forks),
+            f_noun=f_noun,
+            org=config["github_org"],
+            r_noun=r_noun,
+            user=config["github_username"],
+        )
     )
 
     return user_forks
@@ -130,7 +210,32 @@ def create_clones(forks_to_clone, config):
                 pass
 
 
-def sync_clone(clone, config, args, idx, total):
+def parse_branch_output(output):
+    """Given the raw (bytes) output of `git branch` using BRANCH_FORMAT, return
+    a list of local branch names and the name of the checked out branch (None
+    if HEAD is detached)."""
+
+    match = CURRENT_BRANCH_RE.search(output)
+    current_branch = match.group(1).decode() if match else None
+    branches = [x[1:].decode() for x in output.splitlines()]
+
+    return branches, current_branch
+
+
+async def run_cmd(cmd, capture_output=True):
+    """Run a command without blocking the event loop and return its stdout as
+    bytes (None if output was not captured). Like subprocess.run(check=True),
+    raises CalledProcessError if the command exits non-zero."""
+
+    pipe = asyncio.subprocess.PIPE if capture_output else None
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=pipe, stderr=pipe)
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+    return stdout
+
+
+async def sync_clone(clone, config, args, idx, total):
     """Fetch and pull a clone from upstream, and push commits to origin."""
 
     cprint(
@@ -138,28 +243,50 @@ def sync_clone(clone, config, args, idx, total):
         colors.OKBLUE,
     )
     # TODO: Determine this based on GitHub API.
-    branches_cmd = ["git", "-C", clone, "branch"]
-    proc = subprocess.run(branches_cmd, check=True, capture_output=True, text=True)
-    branches = [x.strip() for x in proc.stdout.replace("*", "").split("\n")]
+    branches_cmd = [
+        "git",
+        "-C",
+        clone,
+        "branch",
+        "--no-column",
+        f"--format={BRANCH_FORMAT}",
+    ]
+    stdout = await run_cmd(branches_cmd)
+    branches, current_branch = parse_branch_output(stdout)
     default_branch = "main" if "main" in branches else "master"
-    curr_branch_cmd = ["git", "-C", clone, "branch", "--show-current"]
-    proc = subprocess.run(curr_branch_cmd, check=True, capture_output=True, text=True)
-    current_branch = proc.stdout.strip()
 
     fetch_cmd = ["git", "-C", clone, "fetch", "--all"]
-    _ = subprocess.run(fetch_cmd, check=True, capture_output=args.verbose == 0)
+    await run_cmd(fetch_cmd, capture_output=args.verbose == 0)
     if current_branch in ("main", "master"):
-        pull_cmd = ["git", "-C", clone, "pull", "--ff-only", "upstream", default_branch]
-        _ = subprocess.run(pull_cmd, check=True, capture_output=args.verbose == 0)
+        # Upstream was just fetched above, so merge its branch directly rather
+        # than running `git pull`, which would fetch from upstream again.
+        upstream_branch = f"upstream/{default_branch}"
+        merge_cmd = ["git", "-C", clone, "merge", "--ff-only", upstream_branch]
+        await run_cmd(merge_cmd, capture_output=args.verbose == 0)
         push_cmd = ["git", "-C", clone, "push", "origin"]
-        _ = subprocess.run(push_cmd, check=True, capture_output=args.verbose == 0)
+        await run_cmd(push_cmd, capture_output=args.verbose == 0)
+
 
+async def sync_clones(clones, config, args, max_concurrent):
+    """Sync all clones concurrently, with no more than max_concurrent syncs in
+    progress at a time. A failed sync doesn't stop the others; once all clones
+    are done, each failure is reported and the first one is raised."""
 
-def parallelize(args):
-    """Helper function that allows us to compact needed arguments and pass them
-    to the sync_clone() function."""
+    semaphore = asyncio.Semaphore(max_concurrent)
 
-    return sync_clone(*args)
+    async def limited_sync(idx, clone):
+        async with semaphore:
+            await sync_clone(clone, config, args, idx + 1, len(clones))
+
+    results = await asyncio.gather(
+        *(limited_sync(idx, clone) for idx, clone in enumerate(clones)),
+        return_exceptions=True,
+    )
+    errors = [(c, r) for c, r in zip(clones, results) if isinstance(r, Exception)]
+    for clone, err in errors:
+        cprint(f"Failed to sync clone {os.path.relpath(clone)}: {err}", colors.FAIL)
+    if errors:
+        raise errors[0][1]
 
 
 def main(args, config):
@@ -179,9 +306,8 @@ def main(args, config):
         "(this may take a bit longer)..."
     )
     forks = get_user_forks(repos, config)
-    missing_forks = [
-        x for x in repos if x.full_name not in [y.parent.full_name for y in forks]
-    ]
+    forked_repos = {x.parent.full_name for x in forks}
+    missing_forks = [x for x in repos if x.full_name not in forked_repos]
     if missing_forks:
         forks.extend(create_user_forks(missing_forks, config))
 
@@ -195,15 +321,7 @@ def main(args, config):
         create_clones(missing_clones, config)
 
     print("Syncing clones (fetch/pull from upstream, push to origin)...")
-    # TODO: Offer --serial flag for running syncs one at a time.
-    # for idx, clone in enumerate(clones)
-    #     sync_clone(clones, config, args, idx + 1, len(clones))
-    number_of_workers = 48
-    with ThreadPool(number_of_workers) as pool:
-        pool.map(
-            parallelize,
-            [
-                (clone, config, args, idx + 1, len(clones))
-                for idx, clone in enumerate(clones)
-            ],
-        )
+    # TODO: Offer --serial flag for running syncs one at a time (i.e. a
+    # max_concurrent of 1).
+    max_concurrent = 48
+    asyncio.run(sync_clones(clones, config, args, max_concurrent))
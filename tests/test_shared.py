@@ -1,11 +1,25 @@
 import argparse
+import json
 import os
+import re
 import unittest
+from unittest.mock import mock_open, patch
 
 from shared import colors, get_config, readable_time, trim_leading_org
 
 TESTDIR = os.path.dirname(__file__)
 
+# Matches a single ANSI SGR escape sequence, e.g. "\033[94m"
+ANSI_COLOR_RE = re.compile(r"\033\[[0-9;]+m")
+ALL_COLORS = (
+    colors.HEADER,
+    colors.OKBLUE,
+    colors.OKGREEN,
+    colors.WARNING,
+    colors.FAIL,
+    colors.ENDC,
+)
+
 
 class TestShared(unittest.TestCase):
     """Test class for shared modules."""
@@ -19,20 +33,13 @@ class TestShared(unittest.TestCase):
 
     def test_colors(self):
         """test colors class"""
-        clrs = (
-            colors.HEADER,
-            colors.OKBLUE,
-            colors.OKGREEN,
-            colors.WARNING,
-            colors.FAIL,
-            colors.ENDC,
-        )
-        for clr in clrs:
-            self.assertTrue(clr.startswith("\033["))
-            self.assertTrue(clr.endswith("m"))
+        self.assertTrue(all(ANSI_COLOR_RE.fullmatch(clr) for clr in ALL_COLORS))
 
-    def test_get_config(self):
-        """get_config gets configuration"""
+    @patch("shared.open", new_callable=mock_open, create=True)
+    @patch("shared.os.path.isdir", return_value=True)
+    @patch("shared.os.path.isfile", return_value=False)
+    def test_get_config(self, mock_isfile, mock_isdir, mock_file):
+        """get_config gets configuration without touching the disk"""
         result = get_config(os.path.join(TESTDIR, "test_config.json"), self.test_args)
         expected = {
             "github_username": "nobody",
@@ -40,19 +47,21 @@ class TestShared(unittest.TestCase):
             "github_token": "e391119e7a544f728083332ff1388516",
         }
         self.assertEqual(result, expected)
+        written = mock_file().write.call_args.args[0]
+        self.assertEqual(json.loads(written), expected)
 
     def test_readable_time(self):
         """readable_time produces readable time from an integer of seconds"""
-        result = readable_time(0)
-        self.assertEqual(result, "0 seconds")
-        result = readable_time(1)
-        self.assertEqual(result, "1 second")
-        result = readable_time(59)
-        self.assertEqual(result, "59 seconds")
-        result = readable_time(3661)
-        self.assertEqual(result, "1 hour, 1 minute, 1 second")
-        result = readable_time(208640)
-        self.assertEqual(result, "2 days, 9 hours, 57 minutes, 20 seconds")
+        cases = (
+            (0, "0 seconds"),
+            (1, "1 second"),
+            (59, "59 seconds"),
+            (3661, "1 hour, 1 minute, 1 second"),
+            (208640, "2 days, 9 hours, 57 minutes, 20 seconds"),
+        )
+        for seconds, expected in cases:
+            with self.subTest(seconds=seconds):
+                self.assertEqual(readable_time(seconds), expected)
 
     def test_trim_leading_org_trims(self):
         """trim_leading_org trims leading org"""
@@ -63,3 +72,7 @@ class TestShared(unittest.TestCase):
         """trim_leading_org preserves input if no leading org"""
         result = trim_leading_org("foo", "bar")
         self.assertEqual(result, "foo")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=0, buffer=True)
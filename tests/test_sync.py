@@ -0,0 +1,160 @@
+import asyncio
+import subprocess
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from shared.sync import (
+    BRANCH_FORMAT,
+    GithubException,
+    get_user_forks,
+    parse_branch_output,
+    run_cmd,
+    sync_clones,
+)
+
+CONFIG = {
+    "github_username": "nobody",
+    "github_org": "macadmins",
+    "github_token": "e391119e7a544f728083332ff1388516",
+}
+
+
+def fork_node(name, parent_owner):
+    """Build a fork as returned by the GraphQL forks query."""
+    return {
+        "name": name,
+        "nameWithOwner": f"nobody/{name}",
+        "sshUrl": f"git@github.com:nobody/{name}.git",
+        "parent": {
+            "nameWithOwner": f"{parent_owner}/{name}",
+            "sshUrl": f"git@github.com:{parent_owner}/{name}.git",
+        },
+    }
+
+
+def forks_page(nodes, end_cursor=None):
+    """Build a GraphQL forks query response."""
+    page_info = {"hasNextPage": end_cursor is not None, "endCursor": end_cursor}
+    repos = {"pageInfo": page_info, "nodes": nodes}
+    return {}, {"data": {"viewer": {"repositories": repos}}}
+
+
+class TestSync(unittest.TestCase):
+    """Test class for sync module."""
+
+    def test_parse_branch_output(self):
+        """parse_branch_output finds local branches and the current branch"""
+        branches, current = parse_branch_output(b" develop\n*main\n feature\n")
+        self.assertEqual(branches, ["develop", "main", "feature"])
+        self.assertEqual(current, "main")
+
+    def test_parse_branch_output_tag_clash(self):
+        """parse_branch_output finds the bare branch name if a tag shares it"""
+        with tempfile.TemporaryDirectory() as repo:
+            git = ["git", "-C", repo, "-c", "user.name=t", "-c", "user.email=t@t"]
+            subprocess.run(git + ["init", "-q", "-b", "main"], check=True)
+            subprocess.run(
+                git + ["commit", "-q", "--allow-empty", "-m", "x"], check=True
+            )
+            subprocess.run(git + ["tag", "main"], check=True)
+            branch_cmd = git + ["branch", "--no-column", f"--format={BRANCH_FORMAT}"]
+            proc = subprocess.run(branch_cmd, check=True, capture_output=True)
+        self.assertEqual(parse_branch_output(proc.stdout), (["main"], "main"))
+
+    def test_parse_branch_output_detached(self):
+        """parse_branch_output finds no current branch if HEAD is detached"""
+        _, current = parse_branch_output(b"*(HEAD detached at 1a2b3c4)\n main\n")
+        self.assertIsNone(current)
+
+    @patch("builtins.print")
+    @patch("shared.sync.Github")
+    def test_get_user_forks_graphql(self, mock_github, mock_print):
+        """get_user_forks pages through GraphQL results and keeps org forks"""
+        mock_query = mock_github.return_value.requester.graphql_query
+        mock_query.side_effect = [
+            forks_page([fork_node("munki", "macadmins")], end_cursor="abc"),
+            forks_page([fork_node("recipes", "autopkg")]),
+        ]
+        org_repos = [SimpleNamespace(full_name="macadmins/munki")]
+        result = get_user_forks(org_repos, CONFIG)
+        self.assertEqual([x.full_name for x in result], ["nobody/munki"])
+        self.assertEqual(result[0].parent.ssh_url, "git@github.com:macadmins/munki.git")
+        self.assertEqual(mock_query.call_args.args[1], {"cursor": "abc"})
+        mock_github.return_value.get_user.assert_not_called()
+        mock_print.assert_called_once_with("1 fork of macadmins repo by user nobody.")
+
+    @patch("builtins.print")
+    @patch("shared.sync.cprint")
+    @patch("shared.sync.Github")
+    def test_get_user_forks_rest_fallback(self, mock_github, mock_cprint, mock_print):
+        """get_user_forks falls back to the REST API if GraphQL fails"""
+        mock_gh = mock_github.return_value
+        mock_gh.requester.graphql_query.side_effect = GithubException(502)
+        fork = SimpleNamespace(
+            fork=True, parent=SimpleNamespace(full_name="macadmins/munki")
+        )
+        mock_gh.get_user.return_value.get_repos.return_value = [fork]
+        org_repos = [SimpleNamespace(full_name="macadmins/munki")]
+        self.assertEqual(get_user_forks(org_repos, CONFIG), [fork])
+        warning = mock_cprint.call_args.args[0]
+        self.assertTrue(warning.startswith("WARNING: Unable to list forks"))
+        self.assertIn("502", warning)
+
+    @patch("builtins.print")
+    @patch("shared.sync.Github")
+    def test_get_user_forks_graphql_missing_parent(self, mock_github, mock_print):
+        """get_user_forks skips GraphQL forks whose parent isn't visible"""
+        orphan = fork_node("munki", "macadmins")
+        orphan["parent"] = None
+        mock_query = mock_github.return_value.requester.graphql_query
+        mock_query.return_value = forks_page([orphan])
+        org_repos = [SimpleNamespace(full_name="macadmins/munki")]
+        self.assertEqual(get_user_forks(org_repos, CONFIG), [])
+
+    @patch("builtins.print")
+    @patch("shared.sync.Github")
+    def test_get_user_forks_no_graphql_support(self, mock_github, mock_print):
+        """get_user_forks uses the REST API if PyGithub can't query GraphQL"""
+        fork = SimpleNamespace(
+            fork=True, parent=SimpleNamespace(full_name="macadmins/munki")
+        )
+        mock_user = SimpleNamespace(get_repos=lambda type: [fork])
+        mock_github.return_value = SimpleNamespace(get_user=lambda: mock_user)
+        org_repos = [SimpleNamespace(full_name="macadmins/munki")]
+        self.assertEqual(get_user_forks(org_repos, CONFIG), [fork])
+
+    def test_run_cmd_returns_stdout(self):
+        """run_cmd returns the captured stdout of a successful command"""
+        cmd = [sys.executable, "-c", "print('hello')"]
+        self.assertEqual(asyncio.run(run_cmd(cmd)).strip(), b"hello")
+
+    def test_run_cmd_raises_on_failure(self):
+        """run_cmd raises CalledProcessError if the command exits non-zero"""
+        cmd = [sys.executable, "-c", "raise SystemExit(3)"]
+        with self.assertRaises(subprocess.CalledProcessError) as ctx:
+            asyncio.run(run_cmd(cmd))
+        self.assertEqual(ctx.exception.returncode, 3)
+
+    @patch("shared.sync.cprint")
+    def test_sync_clones_failure_does_not_stop_others(self, mock_cprint):
+        """sync_clones syncs every clone before raising the first failure"""
+        synced = []
+
+        async def fake_sync_clone(clone, config, args, idx, total):
+            synced.append(clone)
+            if clone == "bad":
+                raise subprocess.CalledProcessError(1, ["git", "push"])
+
+        clones = ["bad", "r0", "r1", "r2", "r3"]
+        with patch("shared.sync.sync_clone", new=fake_sync_clone):
+            with self.assertRaises(subprocess.CalledProcessError):
+                asyncio.run(sync_clones(clones, CONFIG, None, max_concurrent=2))
+        self.assertEqual(sorted(synced), sorted(clones))
+        self.assertIn("Failed to sync clone bad", mock_cprint.call_args.args[0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=0, buffer=True)